@@ -1,5 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import json
 import logging
+from collections import OrderedDict
 from typing import Any, Dict, Optional, Sequence, Tuple, Union
 
 import mmcv
@@ -8,10 +10,41 @@ import torch
 from torch.utils.data import Dataset
 
 from mmdeploy.codebase.base import BaseTask
-from mmdeploy.utils import Task, get_root_logger
+from mmdeploy.utils import Task, get_codebase_config, get_root_logger
 from mmdeploy.utils.config_utils import get_input_shape
+from .fast_preprocess import (build_fast_preprocessor, get_crop_size, is_array,
+                              to_numpy)
 from .mmclassification import MMCLS_TASK
 
+_PIPELINE_CACHE_SIZE = 8
+_pipeline_cache = OrderedDict()
+
+
+def _build_pipeline(pipeline: Sequence[Dict]):
+    """Build the mmcls test pipeline, reusing a cached one if possible.
+
+    Composing the pipeline instantiates every transform, which is wasted work
+    when the same config is processed repeatedly, e.g. tasks built in a loop.
+    The cache is keyed on the serialized pipeline config.
+
+    Args:
+        pipeline (Sequence[dict]): The test pipeline config.
+
+    Returns:
+        Compose: The composed test pipeline.
+    """
+    key = json.dumps(pipeline, sort_keys=True, default=str)
+    if key in _pipeline_cache:
+        _pipeline_cache.move_to_end(key)
+        return _pipeline_cache[key]
+
+    from mmcls.datasets.pipelines import Compose
+    test_pipeline = Compose(pipeline)
+    _pipeline_cache[key] = test_pipeline
+    if len(_pipeline_cache) > _PIPELINE_CACHE_SIZE:
+        _pipeline_cache.popitem(last=False)
+    return test_pipeline
+
 
 def process_model_config(model_cfg: mmcv.Config,
                          imgs: Sequence[Union[str, np.ndarray]],
@@ -26,27 +59,46 @@ def process_model_config(model_cfg: mmcv.Config,
             format specifying input shape. Default: None.
 
     Returns:
-        mmcv.Config: the model config after processing.
+        mmcv.Config: the model config after processing. It is `model_cfg`
+            itself if the pipeline does not need to be changed.
     """
-    cfg = model_cfg.deepcopy()
-    if isinstance(imgs[0], str):
-        if cfg.data.test.pipeline[0]['type'] != 'LoadImageFromFile':
-            cfg.data.test.pipeline.insert(0, dict(type='LoadImageFromFile'))
+    pipeline = model_cfg.data.test.pipeline
+    has_loading = pipeline[0]['type'] == 'LoadImageFromFile'
+    if isinstance(imgs[0], str) != has_loading:
+        # rebuilding the Config copies the nested dicts and lists, but unlike
+        # `deepcopy` shares all the leaf values with `model_cfg`
+        cfg = mmcv.Config(dict(model_cfg))
+        pipeline = cfg.data.test.pipeline
+        if has_loading:
+            pipeline.pop(0)
+        else:
+            pipeline.insert(0, dict(type='LoadImageFromFile'))
     else:
-        if cfg.data.test.pipeline[0]['type'] == 'LoadImageFromFile':
-            cfg.data.test.pipeline.pop(0)
+        cfg = model_cfg
     # check whether input_shape is valid
-    if input_shape is not None:
-        if 'crop_size' in cfg.data.test.pipeline[2]:
-            crop_size = cfg.data.test.pipeline[2]['crop_size']
-            if tuple(input_shape) != (crop_size, crop_size):
-                logger = get_root_logger()
-                logger.warning(
-                    f'`input shape` should be equal to `crop_size`: {crop_size},\
-                        but given: {input_shape}')
+    _check_input_shape(get_crop_size(pipeline), input_shape)
     return cfg
 
 
+def _check_input_shape(crop_size: Optional[Tuple[int, int]],
+                       input_shape: Optional[Sequence[int]] = None):
+    """Warn if `input_shape` does not match the crop size of the pipeline.
+
+    Args:
+        crop_size (tuple[int] | None): The crop size in (height, width)
+            format.
+        input_shape (list[int]): A list of two integer in (width, height)
+            format specifying input shape. Default: None.
+    """
+    if input_shape is not None and crop_size is not None:
+        if tuple(input_shape) != crop_size[::-1]:
+            logger = get_root_logger()
+            logger.warning(
+                '`input shape` should be equal to `crop_size` in (width, '
+                f'height) format: {list(crop_size[::-1])}, but given: '
+                f'{list(input_shape)}')
+
+
 @MMCLS_TASK.register_module(Task.CLASSIFICATION.value)
 class Classification(BaseTask):
     """Classification task class.
@@ -61,6 +113,18 @@ class Classification(BaseTask):
     def __init__(self, model_cfg: mmcv.Config, deploy_cfg: mmcv.Config,
                  device: str):
         super(Classification, self).__init__(model_cfg, deploy_cfg, device)
+        self._crop_size = None
+        self._fast_preprocessor = None
+        if 'data' in model_cfg:
+            pipeline = model_cfg.data.test.pipeline
+            self._crop_size = get_crop_size(pipeline)
+            use_compile = get_codebase_config(deploy_cfg).get(
+                'compile_preprocess', False)
+            self._fast_preprocessor = build_fast_preprocessor(
+                pipeline, device, use_compile=use_compile)
+        self._preprocess = None
+        self._postprocess = None
+        self._model_name = None
 
     def init_backend_model(self,
                            model_files: Sequence[str] = None,
@@ -115,22 +179,32 @@ class Classification(BaseTask):
             -> Tuple[Dict, torch.Tensor]:
         """Create input for classifier.
 
+        Arrays, DLPack arrays and image files are processed by
+        `FastPreprocessor` when the test pipeline allows it, otherwise by the
+        mmcls pipeline.
+
         Args:
-            imgs (Union[str, np.ndarray, Sequence]): Input image(s),
-                accepted data type are `str`, `np.ndarray`, Sequence.
+            imgs (Union[str, np.ndarray, torch.Tensor, Sequence]): Input
+                image(s), accepted data type are `str`, `np.ndarray`,
+                `torch.Tensor`, Sequence.
             input_shape (list[int]): A list of two integer in (width, height)
                 format specifying input shape. Default: None.
 
         Returns:
             tuple: (data, img), meta information for the input image and input.
         """
-        from mmcls.datasets.pipelines import Compose
         from mmcv.parallel import collate, scatter
-        if isinstance(imgs, (str, np.ndarray)):
+        if isinstance(imgs, str) or is_array(imgs):
             imgs = [imgs]
+        if self._fast_preprocessor is not None and \
+                self._fast_preprocessor.supports(imgs):
+            _check_input_shape(self._crop_size, input_shape)
+            return self._fast_preprocessor(imgs)
+        # the mmcls pipeline only accepts images as `np.ndarray`
+        imgs = [to_numpy(img) if is_array(img) else img for img in imgs]
         cfg = process_model_config(self.model_cfg, imgs, input_shape)
         data_list = []
-        test_pipeline = Compose(cfg.data.test.pipeline)
+        test_pipeline = _build_pipeline(cfg.data.test.pipeline)
         for img in imgs:
             if isinstance(img, str):
                 data = dict(img_info=dict(filename=img), img_prefix=None)
@@ -275,10 +349,13 @@ class Classification(BaseTask):
         Return:
             dict: Composed of the preprocess information.
         """
-        input_shape = get_input_shape(self.deploy_cfg)
-        cfg = process_model_config(self.model_cfg, [''], input_shape)
-        preprocess = cfg.data.test.pipeline
-        return preprocess
+        if self._preprocess is None:
+            input_shape = get_input_shape(self.deploy_cfg)
+            cfg = process_model_config(self.model_cfg, [''], input_shape)
+            self._preprocess = cfg.data.test.pipeline
+        # the SDK export edits the returned pipeline in place, rebuilding the
+        # ConfigDicts copies the nested dicts and lists but not the values
+        return [mmcv.ConfigDict(transform) for transform in self._preprocess]
 
     def get_postprocess(self) -> Dict:
         """Get the postprocess information for SDK.
@@ -286,16 +363,18 @@ class Classification(BaseTask):
         Return:
             dict: Composed of the postprocess information.
         """
-        postprocess = self.model_cfg.model.head
-        if 'topk' not in postprocess:
-            topk = (1, )
-            logger = get_root_logger()
-            logger.warning('no topk in postprocess config, using default \
-                 topk value.')
-        else:
-            topk = postprocess.topk
-        postprocess.topk = max(topk)
-        return postprocess
+        if self._postprocess is None:
+            postprocess = mmcv.ConfigDict(self.model_cfg.model.head)
+            if 'topk' not in postprocess:
+                topk = (1, )
+                logger = get_root_logger()
+                logger.warning('no topk in postprocess config, using default \
+                     topk value.')
+            else:
+                topk = postprocess.topk
+            postprocess.topk = max(topk)
+            self._postprocess = postprocess
+        return mmcv.ConfigDict(self._postprocess)
 
     def get_model_name(self) -> str:
         """Get the model name.
@@ -303,9 +382,10 @@ class Classification(BaseTask):
         Return:
             str: the name of the model.
         """
-        assert 'backbone' in self.model_cfg.model, 'backbone not in model '
-        'config'
-        assert 'type' in self.model_cfg.model.backbone, 'backbone contains '
-        'no type'
-        name = self.model_cfg.model.backbone.type.lower()
-        return name
+        if self._model_name is None:
+            assert 'backbone' in self.model_cfg.model, \
+                'backbone not in model config'
+            assert 'type' in self.model_cfg.model.backbone, \
+                'backbone contains no type'
+            self._model_name = self.model_cfg.model.backbone.type.lower()
+        return self._model_name
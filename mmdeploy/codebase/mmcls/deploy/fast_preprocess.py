@@ -0,0 +1,727 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import importlib
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import mmcv
+import numpy as np
+import torch
+
+from mmdeploy.utils import get_root_logger
+
+_decode_pool = None
+_decode_pool_lock = threading.Lock()
+
+
+def get_crop_size(pipeline: Sequence[Dict]) -> Optional[Tuple[int, int]]:
+    """Get the crop size of the `CenterCrop` in the pipeline.
+
+    Args:
+        pipeline (Sequence[dict]): The test pipeline config.
+
+    Returns:
+        tuple[int] | None: The crop size in (height, width) format, or `None`
+            if the pipeline does not crop the images.
+    """
+    for transform in pipeline:
+        if transform['type'] == 'CenterCrop':
+            crop_size = transform['crop_size']
+            if isinstance(crop_size, int):
+                crop_size = (crop_size, crop_size)
+            return tuple(crop_size)
+    return None
+
+
+def _parse_tensor_pipeline(pipeline: Sequence[Dict]) -> Optional[Dict]:
+    """Parse the test pipeline into arguments of the tensor fast path.
+
+    Only the common `Resize` -> `CenterCrop` -> `Normalize` -> `ImageToTensor`
+    -> `Collect` layout with default arguments is supported.
+
+    Args:
+        pipeline (Sequence[dict]): The test pipeline config.
+
+    Returns:
+        dict | None: The resize size, crop size and normalization arguments,
+            or `None` if the pipeline contains unsupported transforms.
+    """
+    pipeline = [
+        transform for transform in pipeline
+        if transform['type'] != 'LoadImageFromFile'
+    ]
+    types = [transform['type'] for transform in pipeline]
+    if types != [
+            'Resize', 'CenterCrop', 'Normalize', 'ImageToTensor', 'Collect'
+    ]:
+        return None
+    resize, crop, normalize, to_tensor, collect = pipeline
+    # other backends, e.g. pillow, antialias and would not match cv2
+    if resize.get('interpolation', 'bilinear') != 'bilinear' or \
+            resize.get('adaptive_side', 'short') != 'short' or \
+            resize.get('backend', 'cv2') != 'cv2':
+        return None
+    if crop.get('efficientnet_style', False):
+        return None
+    if list(to_tensor['keys']) != ['img'] or list(collect['keys']) != ['img']:
+        return None
+
+    size = resize['size']
+    if isinstance(size, int):
+        size = (size, size)
+    crop_size = get_crop_size(pipeline)
+    # mmcls `CenterCrop` keeps images smaller than the crop size as they are,
+    # which gives outputs of varying shapes that cannot be batched
+    if size[1] == -1:
+        if size[0] < max(crop_size):
+            return None
+    elif size[0] < crop_size[0] or size[1] < crop_size[1]:
+        return None
+    return dict(
+        size=tuple(size),
+        crop_size=crop_size,
+        mean=np.array(normalize['mean'], dtype=np.float32),
+        std=np.array(normalize['std'], dtype=np.float32),
+        to_rgb=normalize.get('to_rgb', True))
+
+
+def _is_default_loading(pipeline: Sequence[Dict]) -> bool:
+    """Check whether images are loaded by a default `LoadImageFromFile`.
+
+    Args:
+        pipeline (Sequence[dict]): The test pipeline config.
+
+    Returns:
+        bool: `True` if the pipeline has no `LoadImageFromFile` or one that
+            reads color uint8 images from the disk.
+    """
+    for transform in pipeline:
+        if transform['type'] != 'LoadImageFromFile':
+            continue
+        file_client_args = transform.get('file_client_args',
+                                         dict(backend='disk'))
+        return not transform.get('to_float32', False) and \
+            transform.get('color_type', 'color') == 'color' and \
+            file_client_args == dict(backend='disk')
+    return True
+
+
+@lru_cache()
+def _has_gpu_jpeg_decoder() -> bool:
+    """Check whether torchvision can decode JPEG images on CUDA devices.
+
+    Returns:
+        bool: `True` if torchvision>=0.10.0 is installed.
+    """
+    if importlib.util.find_spec('torchvision') is None:
+        return False
+    import torchvision
+    from packaging import version
+    return version.parse(torchvision.__version__) >= version.parse('0.10.0')
+
+
+def _get_jpeg_orientation(data: bytes) -> Optional[int]:
+    """Get the EXIF orientation of a JPEG image.
+
+    Args:
+        data (bytes): The JPEG file content.
+
+    Returns:
+        int | None: The EXIF orientation, 1 if the image has none, or `None`
+            if the markers cannot be parsed.
+    """
+    pos = 2  # skip the SOI marker
+    try:
+        while pos + 4 <= len(data) and data[pos] == 0xFF:
+            marker = data[pos + 1]
+            if marker == 0xDA:  # start of scan, no more metadata
+                return 1
+            length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            if marker == 0xE1 and data[pos + 4:pos + 10] == b'Exif\x00\x00':
+                tiff = data[pos + 10:pos + 2 + length]
+                endian = {b'II': '<', b'MM': '>'}[tiff[:2]]
+                ifd = struct.unpack(endian + 'I', tiff[4:8])[0]
+                count = struct.unpack(endian + 'H', tiff[ifd:ifd + 2])[0]
+                for i in range(count):
+                    entry = ifd + 2 + 12 * i
+                    tag, _, _, value = struct.unpack(
+                        endian + 'HHIH', tiff[entry:entry + 10])
+                    if tag == 0x0112:
+                        return value
+                return 1
+            pos += 2 + length
+    except (KeyError, struct.error):
+        pass
+    return None
+
+
+def _load_image(filename: str,
+                device: str) -> Tuple[Union[np.ndarray, torch.Tensor], bool]:
+    """Load an image in [H x W x C] format.
+
+    JPEG images are decoded on the GPU with nvJPEG through torchvision when
+    `device` is a CUDA device and kept in RGB order, other images are decoded
+    by mmcv on the CPU in BGR order. nvJPEG ignores the EXIF orientation that
+    cv2 applies, so rotated JPEG images are decoded by mmcv as well.
+
+    Args:
+        filename (str): The image file.
+        device (str): A string represents device type.
+
+    Returns:
+        tuple: (img, is_rgb), the loaded image and whether its channels are
+            in RGB order.
+    """
+    if device.startswith('cuda') and _has_gpu_jpeg_decoder() and \
+            filename.lower().endswith(('.jpg', '.jpeg')):
+        from torchvision.io import ImageReadMode, decode_jpeg, read_file
+        data = read_file(filename)
+        # the orientation tag sits in the APP1 segment near the file start
+        if _get_jpeg_orientation(data[:65536].numpy().tobytes()) == 1:
+            try:
+                img = decode_jpeg(data, mode=ImageReadMode.RGB, device=device)
+                return img.permute(1, 2, 0), True
+            except RuntimeError:
+                # e.g. progressive JPEG or torchvision built without nvJPEG
+                pass
+    return mmcv.imread(filename), False
+
+
+def _get_resize_shape(height: int, width: int,
+                      size: Tuple[int, int]) -> Tuple[int, int]:
+    """Get the output shape of mmcls `Resize`.
+
+    Args:
+        height (int): The height of the input image.
+        width (int): The width of the input image.
+        size (tuple[int]): The `size` of mmcls `Resize`. `(s, -1)` resizes
+            the short side to `s`.
+
+    Returns:
+        tuple[int]: The resized shape in (height, width) format.
+    """
+    if size[1] != -1:
+        return tuple(size)
+    short_side = size[0]
+    if min(height, width) == short_side:
+        return (height, width)
+    elif width < height:
+        return (int(short_side * height / width), short_side)
+    else:
+        return (short_side, int(short_side * width / height))
+
+
+def _get_crop_offset(shape: Tuple[int, int],
+                     crop_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Get the top-left corner of mmcls `CenterCrop`.
+
+    Args:
+        shape (tuple[int]): The image shape in (height, width) format.
+        crop_size (tuple[int]): The crop size in (height, width) format.
+
+    Returns:
+        tuple[int]: The (y, x) offset of the crop.
+    """
+    height, width = shape
+    crop_height, crop_width = crop_size
+    y1 = max(0, int(round((height - crop_height) / 2.)))
+    x1 = max(0, int(round((width - crop_width) / 2.)))
+    return y1, x1
+
+
+def _normalize_chw(img: np.ndarray, mean: np.ndarray, inv_std: np.ndarray,
+                   to_rgb: bool, out: np.ndarray):
+    """Normalize an image and transpose it from HWC to CHW in place.
+
+    The cast, the mean subtraction and the transpose share a single pass by
+    writing through a HWC view of `out`, and no temporary array is created.
+
+    Args:
+        img (np.ndarray): An image in [H x W x C] format.
+        mean (np.ndarray): Mean values of 3 channels.
+        inv_std (np.ndarray): Reciprocal std values of 3 channels.
+        to_rgb (bool): Whether to convert the image from BGR to RGB.
+        out (np.ndarray): The float32 output buffer in [C x H x W] format.
+    """
+    if to_rgb:
+        img = img[..., ::-1]
+    out_hwc = out.transpose(1, 2, 0)
+    np.subtract(img, mean, out=out_hwc, casting='unsafe')
+    np.multiply(out_hwc, inv_std, out=out_hwc)
+
+
+def _numpy_pipeline(imgs: Sequence[np.ndarray], size: Tuple[int, int],
+                    crop_size: Tuple[int, int], mean: np.ndarray,
+                    inv_std: np.ndarray, to_rgb: bool) -> np.ndarray:
+    """Resize, center crop and normalize images with cv2 and NumPy.
+
+    Resizing happens on the original dtype before normalization, and the
+    normalized images are written into one pre-allocated batch array.
+
+    Args:
+        imgs (Sequence[np.ndarray]): Images in [H x W x C] format.
+        size (tuple[int]): The `size` of mmcls `Resize`. `(s, -1)` resizes
+            the short side to `s`.
+        crop_size (tuple[int]): The crop size in (height, width) format.
+        mean (np.ndarray): Mean values of 3 channels.
+        inv_std (np.ndarray): Reciprocal std values of 3 channels.
+        to_rgb (bool): Whether to convert the image from BGR to RGB.
+
+    Returns:
+        np.ndarray: The processed images in [N x C x H x W] format.
+    """
+    crop_height, crop_width = crop_size
+    out = np.empty((len(imgs), len(mean), crop_height, crop_width),
+                   dtype=np.float32)
+    for img, img_out in zip(imgs, out):
+        height, width = img.shape[:2]
+        new_size = _get_resize_shape(height, width, size)
+        if new_size != (height, width):
+            # mmcls `Resize` passes its backend explicitly, the default one
+            # follows the global `mmcv.use_backend`
+            img = mmcv.imresize(
+                img, (new_size[1], new_size[0]),
+                interpolation='bilinear',
+                backend='cv2')
+        y1, x1 = _get_crop_offset(new_size, crop_size)
+        img = img[y1:y1 + crop_height, x1:x1 + crop_width]
+        _normalize_chw(img, mean, inv_std, to_rgb, img_out)
+    return out
+
+
+def _tensor_pipeline(imgs: torch.Tensor,
+                     size: Tuple[int, int],
+                     crop_size: Tuple[int, int],
+                     mean: torch.Tensor,
+                     inv_std: torch.Tensor,
+                     to_rgb: bool,
+                     out: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """Resize, center crop and normalize a batch of images with torch
+    operators.
+
+    The result follows mmcls `Resize`, `CenterCrop` and `Normalize`, but runs
+    on whatever device `imgs` lives on.
+
+    Args:
+        imgs (torch.Tensor): Images of the same shape in [N x H x W x C]
+            format.
+        size (tuple[int]): The `size` of mmcls `Resize`. `(s, -1)` resizes
+            the short side to `s`.
+        crop_size (tuple[int]): The crop size in (height, width) format.
+        mean (torch.Tensor): Mean values in [1 x C x 1 x 1] format.
+        inv_std (torch.Tensor): Reciprocal std values in [1 x C x 1 x 1]
+            format.
+        to_rgb (bool): Whether to convert the image from BGR to RGB.
+        out (torch.Tensor, optional): The output tensor, e.g. a slice of a
+            larger batch. Default: None.
+
+    Returns:
+        torch.Tensor: The processed images in [N x C x H x W] format.
+    """
+    height, width = imgs.shape[1:3]
+    new_size = _get_resize_shape(height, width, size)
+
+    imgs = imgs.permute(0, 3, 1, 2).to(
+        torch.float32, memory_format=torch.contiguous_format)
+    if new_size != (height, width):
+        imgs = torch.nn.functional.interpolate(
+            imgs, size=new_size, mode='bilinear', align_corners=False)
+
+    y1, x1 = _get_crop_offset(new_size, crop_size)
+    crop_height, crop_width = crop_size
+    imgs = imgs[:, :, y1:y1 + crop_height, x1:x1 + crop_width]
+
+    if to_rgb:
+        imgs = imgs.flip(1)
+    if out is None:
+        return (imgs - mean).mul_(inv_std)
+    return torch.sub(imgs, mean, out=out).mul_(inv_std)
+
+
+def is_array(img: Any) -> bool:
+    """Check whether an input image is an array rather than a file.
+
+    Args:
+        img (Any): An input image.
+
+    Returns:
+        bool: `True` for `np.ndarray`, `torch.Tensor` and arrays supporting
+            DLPack, e.g. CuPy arrays.
+    """
+    return isinstance(img, (np.ndarray, torch.Tensor)) or hasattr(
+        img, '__dlpack__') or hasattr(img, 'toDlpack')
+
+
+def _to_tensor(img: Any) -> torch.Tensor:
+    """Convert an array to a tensor without copying its data if possible.
+
+    Arrays from other frameworks, e.g. the output of a CuPy or DALI
+    preprocessing step, are shared through DLPack and stay on their device.
+
+    Args:
+        img (Any): An array accepted by `is_array`.
+
+    Returns:
+        torch.Tensor: A tensor sharing memory with `img`, unless `img` is a
+            non-contiguous `np.ndarray`.
+    """
+    if isinstance(img, torch.Tensor):
+        return img
+    if isinstance(img, np.ndarray):
+        return torch.from_numpy(np.ascontiguousarray(img))
+    from torch.utils.dlpack import from_dlpack
+
+    # `from_dlpack` only accepts `__dlpack__` objects since torch 1.10, while
+    # capsules are accepted by all supported versions
+    if hasattr(img, 'toDlpack'):
+        return from_dlpack(img.toDlpack())
+    return from_dlpack(img.__dlpack__())
+
+
+def to_numpy(img: Any) -> np.ndarray:
+    """Convert an array to `np.ndarray` for the mmcls pipeline.
+
+    Args:
+        img (Any): An array accepted by `is_array`.
+
+    Returns:
+        np.ndarray: The image on host memory.
+    """
+    if isinstance(img, np.ndarray):
+        return img
+    return _to_tensor(img).cpu().numpy()
+
+
+def _compile_tensor_pipeline(args: Dict) -> Callable:
+    """Compile the tensor pipeline specialized for fixed arguments.
+
+    Args:
+        args (dict): Arguments of the tensor pipeline, which are baked into
+            the compiled function as constants, except `to_rgb`.
+
+    Returns:
+        Callable: A function processing images in [N x H x W x C] format,
+            taking `to_rgb` as the second argument.
+    """
+
+    args = {key: value for key, value in args.items() if key != 'to_rgb'}
+
+    def pipeline(imgs: torch.Tensor, to_rgb: bool) -> torch.Tensor:
+        return _tensor_pipeline(imgs, to_rgb=to_rgb, **args)
+
+    # by default, the graph is recompiled with dynamic shapes once a second
+    # input shape is seen, instead of once per image resolution
+    return torch.compile(pipeline)
+
+
+def _is_integrated_gpu(device: str) -> bool:
+    """Check whether the device is an integrated GPU, e.g. NVIDIA Jetson.
+
+    Args:
+        device (str): A string represents device type.
+
+    Returns:
+        bool: Whether the device is a CUDA GPU sharing memory with the host.
+    """
+    if not device.startswith('cuda') or not torch.cuda.is_available():
+        return False
+    properties = torch.cuda.get_device_properties(torch.device(device))
+    return bool(getattr(properties, 'is_integrated', False))
+
+
+def _get_decode_pool() -> ThreadPoolExecutor:
+    """Get the thread pool used to load image files concurrently.
+
+    Image decoding in cv2 and torchvision releases the GIL, so threads are
+    enough to decode a batch of files in parallel. The pool is shared by all
+    preprocessors and created on first use.
+
+    Returns:
+        ThreadPoolExecutor: The shared thread pool.
+    """
+    global _decode_pool
+    if _decode_pool is None:
+        with _decode_pool_lock:
+            # checked again, another thread may have created it meanwhile
+            if _decode_pool is None:
+                _decode_pool = ThreadPoolExecutor(
+                    max_workers=min(os.cpu_count() or 1, 8))
+    return _decode_pool
+
+
+class FastPreprocessor:
+    """Preprocess classification inputs without the mmcls pipeline.
+
+    Arrays are resized, center cropped and normalized with cv2 and NumPy on
+    CPU, and with torch operators on other devices. The result follows the
+    mmcls `Resize`, `CenterCrop` and `Normalize` transforms it replaces.
+
+    Args:
+        pipeline_args (dict): Arguments parsed by `_parse_tensor_pipeline`.
+        device (str): A string represents device type.
+        default_loading (bool): Whether image files can be loaded without
+            the mmcls `LoadImageFromFile`.
+        use_compile (bool): Whether to compile the tensor pipeline with
+            `torch.compile` on first use. Falls back to eager mode if the
+            compilation fails. Default: False.
+    """
+
+    def __init__(self,
+                 pipeline_args: Dict,
+                 device: str,
+                 default_loading: bool,
+                 use_compile: bool = False):
+        self.device = device
+        self.default_loading = default_loading
+        std = pipeline_args.pop('std')
+        self.img_norm_cfg = dict(
+            mean=pipeline_args['mean'],
+            std=std,
+            to_rgb=pipeline_args['to_rgb'])
+        pipeline_args['inv_std'] = 1. / std
+        self.pipeline_args = pipeline_args
+        self._device_pipeline_args = None
+        self.use_compile = use_compile and hasattr(torch, 'compile')
+        self._compiled_tensor_pipeline = None
+        # CUDA is only initialized on the first call, as task processors are
+        # also built just to export SDK configs
+        self._is_integrated_gpu = None
+        self._pinned_buffers = {}
+        self._copy_stream = None
+        self._copy_event = None
+
+    def supports(self, imgs: Sequence[Any]) -> bool:
+        """Check whether the inputs can be processed by this preprocessor.
+
+        Args:
+            imgs (Sequence): Input images.
+
+        Returns:
+            bool: `True` if all inputs are arrays, or all inputs are image
+                files that can be loaded without the mmcls pipeline.
+        """
+        if all(is_array(img) for img in imgs):
+            return True
+        return self.default_loading and all(
+            isinstance(img, str) for img in imgs)
+
+    def __call__(self, imgs: Sequence[Any]) -> Tuple[Dict, torch.Tensor]:
+        """Preprocess input images.
+
+        On CPU, the returned tensor is a zero-copy view of the NumPy batch
+        buffer filled by the preprocessing, so no extra copy is made when
+        handing it to the backend.
+
+        Args:
+            imgs (Sequence): Input images accepted by `supports`, arrays in
+                [H x W x C] format or image files.
+
+        Returns:
+            tuple: (data, img), meta information for the input image and input.
+        """
+        filenames = None
+        rgb = False
+        if all(isinstance(img, str) for img in imgs):
+            filenames = imgs
+            imgs, rgb = self._load_images(filenames)
+        else:
+            imgs = [
+                img if isinstance(img, np.ndarray) else _to_tensor(img)
+                for img in imgs
+            ]
+
+        if self.device == 'cpu' and all(
+                isinstance(img, np.ndarray) for img in imgs):
+            batch = torch.from_numpy(
+                _numpy_pipeline(imgs, **self.pipeline_args))
+        else:
+            batch = self._tensor_pipeline_batch(imgs, rgb)
+
+        img_shape = tuple(batch.shape[2:]) + (batch.shape[1], )
+        # each meta gets its own dict as in mmcls `Normalize`, so editing one
+        # does not change later results, the arrays are shared
+        img_metas = [
+            dict(
+                ori_shape=tuple(img.shape),
+                img_shape=img_shape,
+                img_norm_cfg=dict(self.img_norm_cfg)) for img in imgs
+        ]
+        if filenames is not None:
+            for img_meta, filename in zip(img_metas, filenames):
+                img_meta.update(filename=filename, ori_filename=filename)
+        return dict(img=batch, img_metas=img_metas), batch
+
+    def _load_images(
+        self, filenames: Sequence[str]
+    ) -> Tuple[List[Union[np.ndarray, torch.Tensor]], bool]:
+        """Load image files, concurrently for more than one file.
+
+        Args:
+            filenames (Sequence[str]): The image files.
+
+        Returns:
+            tuple: (imgs, rgb), the loaded images and whether their channels
+                are in RGB order.
+        """
+        load_image = partial(_load_image, device=self.device)
+        if len(filenames) > 1:
+            results = list(_get_decode_pool().map(load_image, filenames))
+        else:
+            results = [load_image(filenames[0])]
+        if all(is_rgb for _, is_rgb in results):
+            return [img for img, _ in results], True
+        # some JPEG files fell back to mmcv, keep a single channel order
+        return [
+            img.flip(-1) if is_rgb else img for img, is_rgb in results
+        ], False
+
+    def _get_device_pipeline_args(self) -> Dict:
+        """Get arguments of the tensor pipeline on `self.device`.
+
+        The normalization tensors are created once and reused by every call.
+
+        Returns:
+            dict: Arguments of `_tensor_pipeline`.
+        """
+        if self._device_pipeline_args is None:
+            args = dict(self.pipeline_args)
+            for key in ('mean', 'inv_std'):
+                args[key] = torch.from_numpy(args[key]).to(self.device).view(
+                    1, -1, 1, 1)
+            self._device_pipeline_args = args
+        return self._device_pipeline_args
+
+    def _tensor_pipeline_batch(self,
+                               imgs: Sequence[Union[np.ndarray,
+                                                    torch.Tensor]],
+                               rgb: bool = False) -> torch.Tensor:
+        """Process images with torch operators on `self.device`.
+
+        Args:
+            imgs (Sequence[np.ndarray | torch.Tensor]): Input images in
+                [H x W x C] format.
+            rgb (bool): Whether the images are in RGB order rather than BGR.
+                Default: False.
+
+        Returns:
+            torch.Tensor: The processed images in [N x C x H x W] format.
+        """
+        args = self._get_device_pipeline_args()
+        if rgb:
+            args = dict(args, to_rgb=not args['to_rgb'])
+        imgs = [_to_tensor(img) for img in imgs]
+        if all(img.shape == imgs[0].shape and img.dtype == imgs[0].dtype
+               for img in imgs):
+            # images of the same shape are processed as a single batch
+            batch = self._stack_to_device(imgs)
+            batch = self._run_tensor_pipeline(batch, args)
+        else:
+            # normalized images are written into the batch directly
+            crop_height, crop_width = args['crop_size']
+            batch = torch.empty(
+                (len(imgs), args['mean'].shape[1], crop_height, crop_width),
+                device=self.device)
+            for i, img in enumerate(imgs):
+                img = img.to(self.device, non_blocking=True)
+                _tensor_pipeline(
+                    img.unsqueeze(0), **args, out=batch[i:i + 1])
+        return batch
+
+    def _run_tensor_pipeline(self, imgs: torch.Tensor,
+                             args: Dict) -> torch.Tensor:
+        """Run the tensor pipeline, compiled if `self.use_compile` is set.
+
+        Args:
+            imgs (torch.Tensor): Input images in [N x H x W x C] format.
+            args (dict): Arguments of the tensor pipeline on `self.device`.
+
+        Returns:
+            torch.Tensor: The processed images in [N x C x H x W] format.
+        """
+        if self.use_compile:
+            try:
+                if self._compiled_tensor_pipeline is None:
+                    self._compiled_tensor_pipeline = \
+                        _compile_tensor_pipeline(args)
+                return self._compiled_tensor_pipeline(imgs, args['to_rgb'])
+            except Exception as e:
+                # e.g. Triton or a C++ compiler is not available
+                get_root_logger().warning(
+                    'Failed to compile the preprocessing pipeline, fall back '
+                    f'to eager mode: {e}')
+                self.use_compile = False
+                self._compiled_tensor_pipeline = None
+        return _tensor_pipeline(imgs, **args)
+
+    def _stack_to_device(self, imgs: Sequence[torch.Tensor]) -> torch.Tensor:
+        """Stack images of the same shape and dtype on `self.device`.
+
+        For discrete CUDA devices, CPU images are stacked into a reusable
+        pinned buffer and copied on a side stream, so the transfer is
+        asynchronous and overlaps with work already queued on the current
+        stream. Integrated GPUs share DRAM with the host, so there is no
+        PCIe transfer to hide, and pinned memory is not cached by the CPU on
+        most Jetson boards; the raw images are uploaded directly instead.
+
+        Args:
+            imgs (Sequence[torch.Tensor]): Images of the same shape and dtype.
+
+        Returns:
+            torch.Tensor: The stacked images on `self.device`.
+        """
+        if self.device.startswith('cuda') and self._is_integrated_gpu is None:
+            self._is_integrated_gpu = _is_integrated_gpu(self.device)
+        if not self.device.startswith('cuda') or self._is_integrated_gpu \
+                or any(img.is_cuda for img in imgs):
+            imgs = [img.to(self.device, non_blocking=True) for img in imgs]
+            return torch.stack(imgs, 0)
+
+        shape = (len(imgs), ) + tuple(imgs[0].shape)
+        dtype = imgs[0].dtype
+        numel = len(imgs) * imgs[0].numel()
+        # the previous copy must finish before the buffer is overwritten
+        if self._copy_event is not None:
+            self._copy_event.synchronize()
+        buffer = self._pinned_buffers.get(dtype)
+        if buffer is None or buffer.numel() < numel:
+            buffer = torch.empty(numel, dtype=dtype, pin_memory=True)
+            self._pinned_buffers[dtype] = buffer
+        staging = buffer[:numel].view(shape)
+        torch.stack(imgs, 0, out=staging)
+
+        if self._copy_stream is None:
+            self._copy_stream = torch.cuda.Stream(device=self.device)
+            self._copy_event = torch.cuda.Event()
+        current_stream = torch.cuda.current_stream(self.device)
+        with torch.cuda.stream(self._copy_stream):
+            batch = staging.to(self.device, non_blocking=True)
+            self._copy_event.record(self._copy_stream)
+        current_stream.wait_stream(self._copy_stream)
+        batch.record_stream(current_stream)
+        return batch
+
+
+def build_fast_preprocessor(pipeline: Sequence[Dict],
+                            device: str,
+                            use_compile: bool = False
+                            ) -> Optional[FastPreprocessor]:
+    """Build a fast preprocessor for the test pipeline if it is supported.
+
+    Args:
+        pipeline (Sequence[dict]): The test pipeline config.
+        device (str): A string represents device type.
+        use_compile (bool): Whether to compile the tensor pipeline with
+            `torch.compile` on first use. Default: False.
+
+    Returns:
+        FastPreprocessor | None: The preprocessor, or `None` if the pipeline
+            contains unsupported transforms.
+    """
+    pipeline_args = _parse_tensor_pipeline(pipeline)
+    if pipeline_args is None:
+        return None
+    return FastPreprocessor(pipeline_args, device,
+                            _is_default_loading(pipeline), use_compile)
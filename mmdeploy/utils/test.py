@@ -204,6 +204,22 @@ class DummyModel(torch.nn.Module):
         return self.forward(*args, **kwds)
 
 
+class DummyDLPackArray:
+    """A dummy array of another framework shared through DLPack.
+
+    Args:
+        tensor (torch.Tensor): The data of the array.
+    """
+
+    def __init__(self, tensor: torch.Tensor):
+        self.tensor = tensor
+
+    def __dlpack__(self, stream: Optional[int] = None) -> Any:
+        """Export the array as a DLPack capsule."""
+        from torch.utils.dlpack import to_dlpack
+        return to_dlpack(self.tensor)
+
+
 class SwitchBackendWrapper:
     """A switcher for backend wrapper for unit tests.
     Examples:
@@ -13,7 +13,8 @@ import mmdeploy.backend.onnxruntime as ort_apis
 from mmdeploy.apis import build_task_processor
 from mmdeploy.codebase import import_codebase
 from mmdeploy.utils import Codebase, load_config
-from mmdeploy.utils.test import DummyModel, SwitchBackendWrapper
+from mmdeploy.utils.test import (DummyDLPackArray, DummyModel,
+                                 SwitchBackendWrapper)
 
 try:
     import_codebase(Codebase.MMCLS)
@@ -89,6 +90,7 @@ def backend_model():
 
 def test_init_backend_model(backend_model):
     assert isinstance(backend_model, torch.nn.Module)
+    assert not backend_model.training
 
 
 def test_create_input():
@@ -96,6 +98,134 @@ def test_create_input():
     assert isinstance(inputs, tuple) and len(inputs) == 2
 
 
+@pytest.mark.parametrize('input',
+                         [img, img[..., ::-1],
+                          torch.from_numpy(img)])
+def test_create_tensor_input(input):
+    assert task_processor._fast_preprocessor is not None
+    data, inputs = task_processor.create_input([input, input])
+    assert inputs.shape == (2, 3, 224, 224)
+    assert len(data['img_metas']) == 2
+    data['img_metas'][0]['img_norm_cfg']['to_rgb'] = False
+    assert data['img_metas'][1]['img_norm_cfg']['to_rgb']
+    data, _ = task_processor.create_input([input])
+    assert data['img_metas'][0]['img_norm_cfg']['to_rgb']
+
+
+def test_create_tensor_input_from_file():
+    img_path = 'tests/test_codebase/test_mmcls/data/imgs/dataset/blank.jpg'
+    data, inputs = task_processor.create_input(img_path)
+    assert inputs.shape == (1, 3, 224, 224)
+    assert data['img_metas'][0]['filename'] == img_path
+    _, batch_inputs = task_processor.create_input([img_path] * 3)
+    assert batch_inputs.shape == (3, 3, 224, 224)
+    assert torch.equal(batch_inputs[2], inputs[0])
+
+
+def test_create_tensor_input_mixed_shapes():
+    imgs = [img, np.random.rand(32, 48, 3)]
+    data, inputs = task_processor.create_input(imgs)
+    assert inputs.shape == (2, 3, 224, 224)
+    assert data['img_metas'][1]['ori_shape'] == (32, 48, 3)
+
+
+# the tensor path resizes with `F.interpolate` instead of cv2
+@pytest.mark.parametrize('to_input, atol', [(np.asarray, 1e-4),
+                                            (torch.from_numpy, 5e-2)])
+def test_create_tensor_input_parity(to_input, atol):
+    from mmcls.datasets.pipelines import Compose
+
+    from mmdeploy.codebase.mmcls.deploy.classification import \
+        process_model_config
+    uint8_img = np.random.randint(0, 256, (48, 64, 3), dtype=np.uint8)
+    cfg = process_model_config(model_cfg, [uint8_img])
+    expected = Compose(cfg.data.test.pipeline)(dict(img=uint8_img))['img']
+    _, inputs = task_processor.create_input(to_input(uint8_img))
+    assert torch.allclose(inputs[0], expected, atol=atol)
+
+
+@pytest.fixture(scope='module')
+def fallback_task_processor():
+    """A task processor whose pipeline is not supported by the fast path."""
+    _model_cfg = copy.deepcopy(model_cfg)
+    _model_cfg.data.test.pipeline[1]['interpolation'] = 'bicubic'
+    return build_task_processor(_model_cfg, deploy_cfg, 'cpu')
+
+
+def test_create_input_fallback(fallback_task_processor):
+    assert fallback_task_processor._fast_preprocessor is None
+    data, inputs = fallback_task_processor.create_input([img, img])
+    assert inputs.shape == (2, 3, 224, 224)
+    assert len(data['img_metas']) == 2
+    _, tensor_inputs = fallback_task_processor.create_input(
+        torch.from_numpy(img))
+    assert torch.allclose(tensor_inputs, inputs[:1])
+
+
+def test_create_dlpack_input(fallback_task_processor):
+    tensor = torch.from_numpy(img)
+    _, inputs = task_processor.create_input(DummyDLPackArray(tensor))
+    _, expected = task_processor.create_input(tensor)
+    assert torch.equal(inputs, expected)
+    _, inputs = fallback_task_processor.create_input(DummyDLPackArray(tensor))
+    _, expected = fallback_task_processor.create_input(img)
+    assert torch.allclose(inputs, expected)
+
+
+@pytest.mark.skipif(
+    reason='Only support GPU test', condition=not torch.cuda.is_available())
+def test_create_tensor_input_cuda():
+    cuda_task_processor = build_task_processor(model_cfg, deploy_cfg, 'cuda')
+    for _ in range(2):
+        _, inputs = cuda_task_processor.create_input([img, img])
+        assert inputs.is_cuda and inputs.shape == (2, 3, 224, 224)
+    _, cpu_inputs = task_processor.create_input([img, img])
+    assert torch.allclose(inputs.cpu(), cpu_inputs, atol=1e-1)
+
+
+def test_process_model_config():
+    from mmdeploy.codebase.mmcls.deploy.classification import \
+        process_model_config
+    assert process_model_config(model_cfg, ['']) is model_cfg
+    cfg = process_model_config(model_cfg, [img])
+    assert cfg.data.test.pipeline[0]['type'] == 'Resize'
+    assert model_cfg.data.test.pipeline[0]['type'] == 'LoadImageFromFile'
+
+
+@pytest.mark.parametrize('compile_preprocess', [True, False])
+def test_compile_preprocess(compile_preprocess):
+    _deploy_cfg = copy.deepcopy(deploy_cfg)
+    _deploy_cfg.codebase_config['compile_preprocess'] = compile_preprocess
+    _task_processor = build_task_processor(model_cfg, _deploy_cfg, 'cpu')
+    assert _task_processor._fast_preprocessor.use_compile == (
+        compile_preprocess and hasattr(torch, 'compile'))
+    assert not task_processor._fast_preprocessor.use_compile
+
+
+def test_check_input_shape(monkeypatch):
+    from mmdeploy.codebase.mmcls.deploy import classification
+    messages = []
+
+    class Logger:
+
+        def warning(self, message):
+            messages.append(message)
+
+    monkeypatch.setattr(classification, 'get_root_logger', Logger)
+    classification._check_input_shape((224, 320), [320, 224])
+    assert not messages
+    classification._check_input_shape((224, 320), [224, 320])
+    assert len(messages) == 1
+    assert '[320, 224], but given: [224, 320]' in messages[0]
+
+
+def test_build_pipeline_cache():
+    from mmdeploy.codebase.mmcls.deploy.classification import _build_pipeline
+    pipeline = model_cfg.data.test.pipeline
+    assert _build_pipeline(pipeline) is _build_pipeline(
+        copy.deepcopy(pipeline))
+
+
 def test_run_inference(backend_model):
     input_dict, _ = task_processor.create_input(img, input_shape=img_shape)
     results = task_processor.run_inference(backend_model, input_dict)
@@ -147,3 +277,25 @@ def test_single_gpu_test_and_evaluate():
     outputs = task_processor.single_gpu_test(model, dataloader)
     assert outputs is not None
     task_processor.evaluate_outputs(model_cfg, outputs, dataset)
+
+
+def test_get_preprocess():
+    preprocess = task_processor.get_preprocess()
+    assert preprocess[0]['type'] == 'LoadImageFromFile'
+    preprocess[-1]['meta_keys'] = ['filename']
+    preprocess.pop(0)
+    preprocess = task_processor.get_preprocess()
+    assert preprocess[0]['type'] == 'LoadImageFromFile'
+    assert 'meta_keys' not in preprocess[-1]
+
+
+def test_get_postprocess():
+    postprocess = task_processor.get_postprocess()
+    assert postprocess.topk == 5
+    assert task_processor.model_cfg.model.head.topk == (1, 5)
+    postprocess.pop('type')
+    assert task_processor.get_postprocess().type == 'LinearClsHead'
+
+
+def test_get_model_name():
+    assert task_processor.get_model_name() == 'resnet'
@@ -0,0 +1,195 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os.path as osp
+import struct
+from tempfile import TemporaryDirectory
+
+import mmcv
+import numpy as np
+import pytest
+import torch
+
+from mmdeploy.codebase import import_codebase
+from mmdeploy.utils import Codebase, load_config
+
+try:
+    import_codebase(Codebase.MMCLS)
+except ImportError:
+    pytest.skip(f'{Codebase.MMCLS} is not installed.', allow_module_level=True)
+
+model_cfg_path = 'tests/test_codebase/test_mmcls/data/model.py'
+model_cfg = load_config(model_cfg_path)[0]
+
+
+def test_get_crop_size():
+    from mmdeploy.codebase.mmcls.deploy.fast_preprocess import get_crop_size
+    pipeline = model_cfg.data.test.pipeline
+    assert get_crop_size(pipeline) == (224, 224)
+    assert get_crop_size(pipeline[1:]) == (224, 224)
+    assert get_crop_size([dict(type='CenterCrop',
+                               crop_size=(32, 48))]) == (32, 48)
+    assert get_crop_size([dict(type='Resize', size=(224, 224))]) is None
+
+
+def test_normalize_chw():
+    from mmdeploy.codebase.mmcls.deploy.fast_preprocess import _normalize_chw
+    src = np.random.randint(0, 255, (8, 6, 3), dtype=np.uint8)
+    mean = np.array([123.675, 116.28, 103.53], dtype=np.float32)
+    std = np.array([58.395, 57.12, 57.375], dtype=np.float32)
+    out = np.empty((3, 8, 6), dtype=np.float32)
+    _normalize_chw(src, mean, 1. / std, True, out)
+    expected = mmcv.imnormalize(src, mean, std, True).transpose(2, 0, 1)
+    assert np.allclose(out, expected, atol=1e-4)
+
+
+@pytest.mark.parametrize('legacy', [True, False])
+def test_to_tensor_dlpack(legacy):
+    from mmdeploy.codebase.mmcls.deploy.fast_preprocess import _to_tensor
+    from mmdeploy.utils.test import DummyDLPackArray
+    tensor = torch.rand(8, 6, 3)
+    array = DummyDLPackArray(tensor)
+    if legacy:
+        # e.g. CuPy before v10 only provides `toDlpack`
+        array.toDlpack = array.__dlpack__
+    converted = _to_tensor(array)
+    assert converted.data_ptr() == tensor.data_ptr()
+
+
+@pytest.mark.parametrize('resize', [
+    dict(type='Resize', size=(256, -1), backend='pillow'),
+    dict(type='Resize', size=(256, -1), interpolation='bicubic'),
+    dict(type='Resize', size=(200, 256)),
+    dict(type='Resize', size=(200, -1)),
+])
+def test_parse_tensor_pipeline_unsupported(resize):
+    from mmdeploy.codebase.mmcls.deploy.fast_preprocess import \
+        _parse_tensor_pipeline
+    pipeline = list(model_cfg.data.test.pipeline)
+    assert _parse_tensor_pipeline(pipeline) is not None
+    pipeline[1] = resize
+    assert _parse_tensor_pipeline(pipeline) is None
+
+
+def test_compile_fallback(monkeypatch):
+    from mmdeploy.codebase.mmcls.deploy.fast_preprocess import \
+        build_fast_preprocessor
+
+    def compile(func):
+
+        def compiled(*args, **kwargs):
+            raise RuntimeError('compiler not available')
+
+        return compiled
+
+    monkeypatch.setattr(torch, 'compile', compile, raising=False)
+    pipeline = model_cfg.data.test.pipeline
+    preprocessor = build_fast_preprocessor(pipeline, 'cpu', use_compile=True)
+    imgs = [torch.rand(32, 48, 3) * 255] * 2
+    _, inputs = preprocessor(imgs)
+    assert not preprocessor.use_compile
+    _, expected = build_fast_preprocessor(pipeline, 'cpu')(imgs)
+    assert torch.equal(inputs, expected)
+
+
+def test_lazy_device_state():
+    from mmdeploy.codebase.mmcls.deploy.fast_preprocess import \
+        build_fast_preprocessor
+    pipeline = model_cfg.data.test.pipeline
+    preprocessor = build_fast_preprocessor(pipeline, 'cuda', use_compile=True)
+    assert preprocessor._device_pipeline_args is None
+    assert preprocessor._is_integrated_gpu is None
+    assert preprocessor._compiled_tensor_pipeline is None
+
+
+@pytest.mark.skipif(
+    reason='Only support GPU test', condition=not torch.cuda.is_available())
+def test_gpu_jpeg_decode():
+    from mmdeploy.codebase.mmcls.deploy.fast_preprocess import (
+        _has_gpu_jpeg_decoder, _load_image, build_fast_preprocessor)
+    if not _has_gpu_jpeg_decoder():
+        pytest.skip('torchvision with GPU JPEG decoding is not installed.')
+    # a smooth image keeps the difference between JPEG decoders small
+    y, x = np.mgrid[0:96, 0:128]
+    src = np.stack([2 * y, 2 * x, 255 - x - y], -1).astype(np.uint8)
+    with TemporaryDirectory() as dir_name:
+        img_path = osp.join(dir_name, 'img.jpg')
+        mmcv.imwrite(src, img_path)
+        img, is_rgb = _load_image(img_path, 'cuda')
+        expected = mmcv.imread(img_path)
+        assert is_rgb and img.is_cuda
+        diff = np.abs(
+            img.cpu().numpy().astype(np.float32) -
+            expected[..., ::-1].astype(np.float32))
+        assert diff.mean() < 1 and diff.max() <= 8
+
+        pipeline = model_cfg.data.test.pipeline
+        _, inputs = build_fast_preprocessor(pipeline, 'cuda')([img_path] * 2)
+        _, cpu_inputs = build_fast_preprocessor(pipeline, 'cpu')([img_path])
+    assert torch.allclose(inputs[1].cpu(), cpu_inputs[0], atol=0.15)
+
+
+def test_get_decode_pool_concurrent(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from mmdeploy.codebase.mmcls.deploy import fast_preprocess
+    monkeypatch.setattr(fast_preprocess, '_decode_pool', None)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        pools = list(
+            executor.map(lambda _: fast_preprocess._get_decode_pool(),
+                         range(32)))
+    assert all(pool is pools[0] for pool in pools)
+    pools[0].shutdown()
+
+
+def test_numpy_pipeline_ignores_global_backend():
+    from mmdeploy.codebase.mmcls.deploy.fast_preprocess import \
+        build_fast_preprocessor
+    preprocessor = build_fast_preprocessor(model_cfg.data.test.pipeline,
+                                           'cpu')
+    img = np.random.randint(0, 256, (48, 64, 3), dtype=np.uint8)
+    _, expected = preprocessor([img])
+    try:
+        mmcv.use_backend('pillow')
+        _, inputs = preprocessor([img])
+    finally:
+        mmcv.use_backend('cv2')
+    assert torch.equal(inputs, expected)
+
+
+def _encode_jpeg(img: np.ndarray, orientation: int = None) -> bytes:
+    """Encode an image as JPEG, with an EXIF orientation tag if given."""
+    import cv2
+    data = cv2.imencode('.jpg', img)[1].tobytes()
+    if orientation is None:
+        return data
+    tiff = b'MM' + struct.pack('>HIH', 42, 8, 1) + struct.pack(
+        '>HHIHHI', 0x0112, 3, 1, orientation, 0, 0)
+    app1 = b'\xff\xe1' + struct.pack('>H', 8 + len(tiff)) + b'Exif\x00\x00'
+    return data[:2] + app1 + tiff + data[2:]
+
+
+def test_get_jpeg_orientation():
+    from mmdeploy.codebase.mmcls.deploy.fast_preprocess import \
+        _get_jpeg_orientation
+    img = np.random.randint(0, 256, (40, 60, 3), dtype=np.uint8)
+    assert _get_jpeg_orientation(_encode_jpeg(img)) == 1
+    assert _get_jpeg_orientation(_encode_jpeg(img, 6)) == 6
+    assert _get_jpeg_orientation(b'\xff\xd8\x00') is None
+
+
+@pytest.mark.skipif(
+    reason='Only support GPU test', condition=not torch.cuda.is_available())
+def test_gpu_jpeg_decode_exif_orientation():
+    from mmdeploy.codebase.mmcls.deploy.fast_preprocess import (
+        _has_gpu_jpeg_decoder, _load_image)
+    if not _has_gpu_jpeg_decoder():
+        pytest.skip('torchvision with GPU JPEG decoding is not installed.')
+    src = np.random.randint(0, 256, (40, 60, 3), dtype=np.uint8)
+    with TemporaryDirectory() as dir_name:
+        img_path = osp.join(dir_name, 'img.jpg')
+        with open(img_path, 'wb') as f:
+            f.write(_encode_jpeg(src, orientation=6))
+        img, is_rgb = _load_image(img_path, 'cuda')
+        expected = mmcv.imread(img_path)
+    # the rotated image is left to mmcv, which applies the orientation
+    assert not is_rgb and expected.shape == (60, 40, 3)
+    assert np.array_equal(img, expected)